@@ -1,14 +1,27 @@
 #!/usr/bin/env python3
 """Update ArgoCD Application spec.source.targetRevision for a Helm chart."""
 
+import copy
+import fcntl
+import functools
+import hashlib
 import os
+import pickle
+import re
 import sys
 import tempfile
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import urlparse, urlunparse
 
 import yaml
 
+try:  # libyaml C bindings: ~3-10x faster load/dump than the pure-Python classes
+    from yaml import CSafeDumper as _Dumper, CSafeLoader as _Loader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeDumper as _Dumper, SafeLoader as _Loader
+
 
 def fail(message: str) -> None:
     print(message, file=sys.stderr)
@@ -25,16 +38,20 @@ def get_input(name: str, default: str | None = None, *, required: bool = False)
     return val
 
 
+_SSH_PREFIX = "git@github.com:"
+_AUTHED_PREFIX = "https://x-access-token:"
+
+
 def build_auth_url(repo_url: str, token: str) -> str:
     normalized = repo_url.strip()
-    if normalized.startswith("git@github.com:"):
-        normalized = normalized.replace("git@github.com:", "https://github.com/")
+    if normalized.startswith(_AUTHED_PREFIX):
+        return normalized  # already carries a token: skip the urlparse round-trip
+    if normalized.startswith(_SSH_PREFIX):
+        normalized = normalized.replace(_SSH_PREFIX, "https://github.com/")
     if not normalized.endswith(".git"):
         normalized = normalized.rstrip("/") + ".git"
     if not normalized.startswith("https://"):
         return repo_url
-    from urllib.parse import urlparse, urlunparse
-
     parsed = urlparse(normalized)
     netloc = f"x-access-token:{token}@{parsed.hostname}"
     if parsed.port:
@@ -42,6 +59,56 @@ def build_auth_url(repo_url: str, token: str) -> str:
     return urlunparse((parsed.scheme, netloc, parsed.path, parsed.params, parsed.query, parsed.fragment))
 
 
+@functools.lru_cache(maxsize=128)
+def _parse_cached(digest: bytes, raw: bytes) -> object:
+    return yaml.load(raw, Loader=_Loader)
+
+
+def parse_yaml(content: str) -> object:
+    """Parse YAML, memoizing by content hash when ARGOHELM_PARSE_CACHE=1.
+
+    Only pays off for long-lived processes that parse the same document
+    repeatedly (library use, batch runners); per-run behaviour is identical.
+    Cached documents are deep-copied on the way out so callers can mutate
+    their result without poisoning the cache.
+    """
+    if os.environ.get("ARGOHELM_PARSE_CACHE") != "1":
+        return yaml.load(content, Loader=_Loader)
+    raw = content.encode("utf-8")
+    digest = hashlib.blake2b(raw, digest_size=16).digest()
+    return copy.deepcopy(_parse_cached(digest, raw))
+
+
+def _yaml_cache_dir() -> Path:
+    return Path(os.environ.get("RUNNER_TOOL_CACHE", tempfile.gettempdir())) / "argohelm-pkg"
+
+
+def load_yaml_cached(path: Path) -> object:
+    """Parse a YAML file, memoizing the result on disk keyed by content hash.
+
+    Enabled with ARGOHELM_YAML_CACHE=1: repeated runs against an unchanged file
+    (e.g. a matrix job updating many packages) hit a pickle.load instead of a
+    full YAML parse. Disabled, this is a plain read + parse.
+    """
+    data = path.read_bytes()
+    if os.environ.get("ARGOHELM_YAML_CACHE") != "1":
+        return yaml.load(data, Loader=_Loader)
+    cache_dir = _yaml_cache_dir()
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    cache_file = cache_dir / f"{digest}.pkl"
+    if cache_file.is_file():
+        try:
+            return pickle.loads(cache_file.read_bytes())
+        except Exception:
+            pass  # corrupt cache entry: fall through and re-parse
+    doc = yaml.load(data, Loader=_Loader)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = cache_dir / f".{digest}.{os.getpid()}.tmp"
+    tmp.write_bytes(pickle.dumps(doc))
+    os.replace(tmp, cache_file)
+    return doc
+
+
 def resolve_application_path(workdir: str, package_path: str, chart_name: str | None) -> tuple[str, dict]:
     resolved = Path(workdir) / package_path
     resolved = resolved.resolve()
@@ -52,48 +119,326 @@ def resolve_application_path(workdir: str, package_path: str, chart_name: str |
     if not resolved.is_file():
         fail(f"Path {resolved} is not a file.")
     content = resolved.read_text(encoding="utf-8")
-    doc = yaml.safe_load(content)
+    doc = parse_yaml(content)
     if not doc or doc.get("kind") != "Application":
         fail(f"File {resolved} is not an ArgoCD Application manifest.")
     return (str(resolved), doc)
 
 
-def update_target_revision(doc: dict, version: str, chart_name: str | None) -> None:
-    spec = doc.get("spec") or {}
-    source = spec.get("source")
-    sources = spec.get("sources")
-
-    if sources and isinstance(sources, list):
-        target = None
-        if chart_name:
-            for s in sources:
-                if s and s.get("chart") == chart_name:
-                    target = s
-                    break
-        if target is None:
-            target = sources[0] if sources else None
-        if not target:
-            fail(f'Chart "{chart_name}" not found in spec.sources.')
-        target["targetRevision"] = version
-        return
-
+def _update_single(source: dict | None, version: str, chart_name: str | None) -> bool:
     if not source:
         fail("Application manifest has no spec.source (or spec.sources).")
     if chart_name and source.get("chart") != chart_name:
         fail(f'Chart in spec.source is "{source.get("chart")}", not "{chart_name}".')
+    if source.get("targetRevision") == version:
+        return False
     source["targetRevision"] = version
+    return True
+
+
+def _update_multi(sources: list, version: str, chart_name: str | None) -> bool:
+    target = None
+    if chart_name:
+        for s in sources:
+            if s and s.get("chart") == chart_name:
+                target = s
+                break
+    if target is None:
+        target = sources[0] if sources else None
+    if not target:
+        fail(f'Chart "{chart_name}" not found in spec.sources.')
+    if target.get("targetRevision") == version:
+        return False
+    target["targetRevision"] = version
+    return True
+
+
+def update_target_revision(doc: dict, version: str, chart_name: str | None) -> bool:
+    """Set targetRevision on the matching source. Returns False when it is already at version."""
+    spec = doc.get("spec") or {}
+    sources = spec.get("sources")
+    if sources and isinstance(sources, list):
+        return _update_multi(sources, version, chart_name)
+    return _update_single(spec.get("source"), version, chart_name)
+
+
+def _lookup_package(package_doc: object, package_name: str) -> dict | None:
+    if not package_doc or not isinstance(package_doc.get("packages"), list):
+        fail('Package file must contain a top-level "packages" array.')
+    by_name: dict[str, dict] = {}
+    for p in package_doc["packages"]:
+        if isinstance(p, dict) and "name" in p:
+            by_name.setdefault(p["name"], p)  # first match wins, as before
+    return by_name.get(package_name)
+
+
+class _StreamFallback(Exception):
+    """Raised when the streaming package search cannot handle the document."""
+
+
+def find_package_streaming(content: str, package_name: str) -> dict | None:
+    """Pull-parse the package file and stop at the named package's entry.
+
+    Walks libyaml's event stream instead of materializing the whole document,
+    so a match near the top of a large file terminates early. Scalar values of
+    skipped entries are never resolved. Returns the package dict, or None when
+    the packages sequence holds no such name. Raises _StreamFallback for any
+    shape this fast path does not understand (no packages sequence, nested
+    values, anchors); the caller then does a full parse.
+    """
+    # Multi-document streams must keep full-load semantics (safe_load raises a
+    # ComposerError). Checking events is not enough: a match in the first
+    # document returns before the parser reaches the separator. Every document
+    # after the first starts at a line beginning with "---", so probe the text.
+    if "\n---" in content:
+        raise _StreamFallback
+    stack: list[list] = []  # ["map", expecting_key] or ["seq"]
+    current_key = None
+    packages_depth: int | None = None
+    item: dict | None = None  # key -> (raw value, style) for the entry being read
+    saw_packages = False
+
+    def resolve(raw: str, style: str | None) -> object:
+        # Plain scalars carry implicit types (true, 42, null); quoted ones are strings.
+        return yaml.load(raw, Loader=_Loader) if style in (None, "") else raw
+
+    for ev in yaml.parse(content, Loader=_Loader):
+        if isinstance(ev, yaml.ScalarEvent):
+            top = stack[-1] if stack else None
+            if top is None or top[0] != "map":
+                if packages_depth is not None and len(stack) == packages_depth:
+                    continue  # scalar entry in the packages list: not a package
+                raise _StreamFallback
+            if top[1]:
+                current_key = ev.value
+                top[1] = False
+            else:
+                if item is not None and packages_depth is not None and len(stack) == packages_depth + 1:
+                    item[current_key] = (ev.value, ev.style)
+                elif len(stack) == 1 and current_key == "packages":
+                    raise _StreamFallback  # packages: <scalar>
+                top[1] = True
+        elif isinstance(ev, yaml.MappingStartEvent):
+            if len(stack) == 1 and stack[0][0] == "map" and not stack[0][1] and current_key == "packages":
+                raise _StreamFallback  # packages: is a mapping, not a sequence
+            if packages_depth is not None and len(stack) == packages_depth and item is None:
+                item = {}
+            elif item is not None:
+                raise _StreamFallback  # nested collection inside a package entry
+            stack.append(["map", True])
+        elif isinstance(ev, yaml.SequenceStartEvent):
+            if len(stack) == 1 and stack[0][0] == "map" and not stack[0][1] and current_key == "packages":
+                saw_packages = True
+                packages_depth = len(stack) + 1
+            elif item is not None:
+                raise _StreamFallback
+            stack.append(["seq"])
+        elif isinstance(ev, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+            closed = stack.pop()
+            if stack and stack[-1][0] == "map":
+                stack[-1][1] = True
+            if item is not None and closed[0] == "map" and len(stack) == packages_depth:
+                name = item.get("name")
+                # Resolve before comparing so implicitly typed names (123, yes)
+                # match exactly when the full-parse path would match them.
+                if name is not None and resolve(*name) == package_name:
+                    return {k: resolve(v, s) for k, (v, s) in item.items()}
+                item = None
+            elif closed[0] == "seq" and packages_depth is not None and len(stack) == packages_depth - 1:
+                return None  # packages sequence exhausted without a match
+        elif isinstance(ev, yaml.AliasEvent):
+            raise _StreamFallback
+    if not saw_packages:
+        raise _StreamFallback
+    return None
+
+
+_TR_LINE = re.compile(r"^(?P<prefix>\s*(?:- )?targetRevision:\s*)(?P<value>\S[^#\n]*?)(?P<suffix>\s*(?:#[^\n]*)?(?:\r?\n)?)$")
+_CHART_LINE = re.compile(r"^\s*(?:- )?chart:\s*(?P<value>\S[^#\n]*?)\s*(?:#[^\n]*)?$")
+
+
+def _block_chart(lines: list[str], index: int, key_indent: int) -> str | None:
+    """Return the chart declared in the same mapping block as lines[index], if any."""
+
+    def effective_indent(line: str) -> tuple[int, bool]:
+        dash = line.lstrip().startswith("- ")
+        indent = len(line) - len(line.lstrip())
+        return (indent + 2 if dash else indent, dash)
+
+    for upward in (True, False):
+        indices = range(index - 1, -1, -1) if upward else range(index + 1, len(lines))
+        for j in indices:
+            stripped = lines[j].strip()
+            if not stripped or stripped.startswith("#"):
+                continue
+            eff, dash = effective_indent(lines[j])
+            if eff < key_indent:
+                break  # left the block
+            if eff == key_indent:
+                if dash and not upward:
+                    break  # the next sequence item starts here; its chart is not ours
+                match = _CHART_LINE.match(lines[j])
+                if match:
+                    return match.group("value").strip("'\"")
+                if dash:
+                    break  # reached the item's own dash line
+    return None
+
+
+def _locate_target_revision(text: str, chart_name: str | None) -> tuple[list[str], int, re.Match] | None:
+    """Find the one targetRevision line to rewrite; None when ambiguous."""
+    lines = text.splitlines(keepends=True)
+    matches = [(i, m) for i, m in ((i, _TR_LINE.match(line)) for i, line in enumerate(lines)) if m]
+    if chart_name is not None:
+
+        def key_indent(prefix: str) -> int:
+            indent = len(prefix) - len(prefix.lstrip())
+            return indent + 2 if prefix.lstrip().startswith("- ") else indent
+
+        matches = [(i, m) for i, m in matches if _block_chart(lines, i, key_indent(m.group("prefix"))) == chart_name]
+    if len(matches) != 1:
+        return None
+    index, match = matches[0]
+    return lines, index, match
+
+
+def _requote(old_value: str, version: str) -> str:
+    """New scalar carrying over the quoting style of the value it replaces."""
+    old = old_value.rstrip()
+    quote = old[0] if len(old) >= 2 and old[0] in "\"'" and old[-1] == old[0] else ""
+    return quote + version + quote
+
+
+def _splice_write(app_file: Path, raw: bytes, start: int, end: int, replacement: str) -> None:
+    """Replace raw[start:end] on disk without materializing a patched copy.
+
+    The unchanged prefix and suffix are written as memoryview slices of the
+    original buffer, into a tempfile in the same directory that is published
+    atomically via os.replace.
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=str(app_file.parent), prefix=f".{app_file.name}.")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(memoryview(raw)[:start])
+            out.write(replacement.encode("utf-8"))
+            out.write(memoryview(raw)[end:])
+        # mkstemp creates the file 0600; carry over the original mode so the
+        # replace does not flip e.g. an executable manifest to non-executable
+        # in the cached clone (and from there into the pushed commit).
+        os.chmod(tmp_name, os.stat(app_file).st_mode)
+        os.replace(tmp_name, app_file)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+def write_revision(app_path: str, app_doc: dict, version: str, chart_name: str | None) -> None:
+    """Write the new targetRevision to disk, patching the file in place when possible.
+
+    When the targetRevision line can be located unambiguously, only its value
+    is rewritten, so comments and formatting survive. Otherwise (no match,
+    several candidates, flow style) the parsed document — which must already
+    carry the new version — is re-emitted.
+    """
+    app_file = Path(app_path)
+    raw = app_file.read_bytes()
+    original = raw.decode("utf-8")
+    located = _locate_target_revision(original, chart_name)
+    if located is not None:
+        lines, index, match = located
+        replacement = _requote(match.group("value"), version)
+        if len(original) == len(raw):
+            # Pure ASCII (the usual case): character offsets are byte
+            # offsets, so splice the new scalar between slices of the
+            # original buffer instead of building a patched string.
+            offset = sum(len(line) for line in lines[:index])
+            _splice_write(app_file, raw, offset + match.start("value"), offset + match.end("value"), replacement)
+        else:
+            lines[index] = match.group("prefix") + replacement + match.group("suffix")
+            app_file.write_text("".join(lines), encoding="utf-8")
+    else:
+        # Ambiguous or flow-style manifest: re-emit the parsed document.
+        # Binary mode + encoding= lets libyaml write raw UTF-8 bytes
+        # without round-tripping every event through Python's text layer.
+        with open(app_path, "wb") as f:
+            yaml.dump(
+                app_doc,
+                f,
+                Dumper=_Dumper,
+                default_flow_style=False,
+                allow_unicode=True,
+                sort_keys=False,
+                encoding="utf-8",
+            )
 
 
 def run_git(args: list[str], cwd: str, check: bool = True) -> subprocess.CompletedProcess:
+    # stdout is never inspected (only returncode is), so don't buffer it in
+    # Python at all; stderr is kept as bytes and decoded only on failure.
     return subprocess.run(
         ["git"] + args,
         cwd=cwd,
-        capture_output=True,
-        text=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
         check=check,
     )
 
 
+# Held for the lifetime of the process so concurrent runs against the same
+# cached clone serialize instead of corrupting each other's working tree.
+_clone_lock = None
+
+
+def prepare_workdir(repo_url: str, auth_url: str, branch: str, package_file_dir: str) -> str:
+    """Return a working tree for repo_url at branch, reusing a cached clone when present.
+
+    The clone lives under RUNNER_TOOL_CACHE (fallback: the temp dir) keyed by
+    repo URL. On a cache hit only a thin fetch + reset is needed; on a miss we
+    do the blobless sparse clone. Either way the sparse set is (re)pointed at
+    the package file's directory.
+    """
+    global _clone_lock
+    cache_root = Path(os.environ.get("RUNNER_TOOL_CACHE", tempfile.gettempdir())) / "argohelm"
+    cache_dir = cache_root / hashlib.sha1(repo_url.encode()).hexdigest()
+    cache_root.mkdir(parents=True, exist_ok=True)
+    _clone_lock = open(cache_dir.with_suffix(".lock"), "w")
+    fcntl.flock(_clone_lock, fcntl.LOCK_EX)
+
+    workdir = str(cache_dir)
+    sparse_dirs = [] if package_file_dir == "." else [package_file_dir]
+    if (cache_dir / ".git").is_dir():
+        print("Refreshing cached clone...")
+        run_git(["remote", "set-url", "origin", auth_url], cwd=workdir)
+        run_git(["fetch", "--depth=1", "origin", branch], cwd=workdir)
+        run_git(["sparse-checkout", "set", *sparse_dirs], cwd=workdir)
+        run_git(["reset", "--hard", "FETCH_HEAD"], cwd=workdir)
+        run_git(["clean", "-fdx"], cwd=workdir)
+    else:
+        print("Cloning repository...")
+        # Partial clone: defer blob download (protocol v2) and check out only
+        # the directories we actually read.
+        run_git(
+            [
+                "clone",
+                "--filter=blob:none",
+                "--no-checkout",
+                "--branch",
+                branch,
+                "--single-branch",
+                "--depth",
+                "1",
+                auth_url,
+                workdir,
+            ],
+            cwd=str(cache_root),
+        )
+        run_git(["sparse-checkout", "init", "--cone"], cwd=workdir)
+        run_git(["sparse-checkout", "set", *sparse_dirs], cwd=workdir)
+        run_git(["checkout", branch], cwd=workdir)
+    return workdir
+
+
 def main() -> None:
     repo_url = get_input("repo-url", required=True).strip()
     token = get_input("token", required=True).strip()
@@ -103,34 +448,28 @@ def main() -> None:
     chart_name = (get_input("chart-name", default="").strip() or None)
     branch = (get_input("branch", default="main").strip() or "main")
     environment = get_input("environment", default="").strip()
+    environments = [e.strip() for e in environment.split(",") if e.strip()]
 
     if token:
         print(f"::add-mask::{token}", flush=True)
 
-    workdir = tempfile.mkdtemp(prefix="argocd-helm-")
     auth_url = build_auth_url(repo_url, token)
-
-    print("Cloning repository...")
-    clone_cwd = os.path.dirname(workdir) or "."
-    run_git(
-        ["clone", "--branch", branch, "--single-branch", "--depth", "1", auth_url, workdir],
-        cwd=clone_cwd,
-    )
+    package_file_dir = str(Path(package_file_path).parent)
+    workdir = prepare_workdir(repo_url, auth_url, branch, package_file_dir)
 
     package_file_full = Path(workdir) / package_file_path
     if not package_file_full.exists():
         fail(f"Package file not found: {package_file_full}")
 
-    package_content = package_file_full.read_text(encoding="utf-8")
-    package_doc = yaml.safe_load(package_content)
-    if not package_doc or not isinstance(package_doc.get("packages"), list):
-        fail('Package file must contain a top-level "packages" array.')
-
-    pkg = None
-    for p in package_doc["packages"]:
-        if p and p.get("name") == package_name:
-            pkg = p
-            break
+    if os.environ.get("ARGOHELM_YAML_CACHE") == "1":
+        pkg = _lookup_package(load_yaml_cached(package_file_full), package_name)
+    else:
+        package_content = package_file_full.read_text(encoding="utf-8")
+        try:
+            # Early termination: parsing stops once the named entry is found.
+            pkg = find_package_streaming(package_content, package_name)
+        except _StreamFallback:
+            pkg = _lookup_package(parse_yaml(package_content), package_name)
     if not pkg:
         print(f'Package "{package_name}" not found in {package_file_path}; skipping.')
         return
@@ -142,24 +481,68 @@ def main() -> None:
 
     pkg_path = pkg.get("path") or "./"
     if "$" in pkg_path:
-        if not environment:
+        if not environments:
             fail("Package path contains $; the environment input is required.")
-        pkg_path = pkg_path.replace("$", environment)
-
-    app_path, app_doc = resolve_application_path(workdir, pkg_path, chart_name)
-    update_target_revision(app_doc, version, chart_name)
-    with open(app_path, "w", encoding="utf-8") as f:
-        yaml.dump(app_doc, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
-    rel_path = Path(app_path).relative_to(workdir)
-    print(f"Updated targetRevision to {version} in {rel_path}")
+        # Environments can share a manifest (e.g. a common base file); parse
+        # and rewrite each unique file once instead of once per environment.
+        env_paths = []
+        seen = set()
+        for env in environments:
+            env_path = pkg_path.replace("$", env)
+            normalized = os.path.normpath(env_path)
+            if normalized not in seen:
+                seen.add(normalized)
+                env_paths.append(env_path)
+    else:
+        env_paths = [pkg_path]
+
+    # Phase two: pull in the Application manifests' directories before resolving.
+    app_dirs = sorted({str(Path(p).parent) for p in env_paths} - {".", package_file_dir})
+    if app_dirs:
+        run_git(["sparse-checkout", "add", *app_dirs], cwd=workdir)
+
+    def write_update(target: tuple[str, dict]) -> str:
+        app_path, app_doc = target
+        write_revision(app_path, app_doc, version, chart_name)
+        rel_path = str(Path(app_path).relative_to(workdir))
+        print(f"Updated targetRevision to {version} in {rel_path}")
+        return rel_path
+
+    # Resolve and validate every target before touching any file: a bad
+    # manifest in the middle of the list must not leave earlier environments
+    # half-updated, and an all-noop run must not pay for a single write.
+    if len(env_paths) > 1:
+        # One Application per environment: the reads/parses release the GIL in
+        # libyaml, and each write targets a distinct file, so both phases can
+        # run on a thread pool. ex.map preserves the input order.
+        with ThreadPoolExecutor(max_workers=min(8, len(env_paths))) as ex:
+            targets = list(ex.map(lambda p: resolve_application_path(workdir, p, chart_name), env_paths))
+            changed = [t for t in targets if update_target_revision(t[1], version, chart_name)]
+            rel_paths = list(ex.map(write_update, changed))
+    else:
+        target = resolve_application_path(workdir, env_paths[0], chart_name)
+        changed = [target] if update_target_revision(target[1], version, chart_name) else []
+        rel_paths = [write_update(t) for t in changed]
+
+    if not rel_paths:
+        print("No changes to commit (targetRevision already set to this version).")
+        return
 
-    run_git(["config", "user.name", "github-actions[bot]"], cwd=workdir)
-    run_git(["config", "user.email", "github-actions[bot]@users.noreply.github.com"], cwd=workdir)
-    run_git(["add", str(rel_path)], cwd=workdir)
+    run_git(["add", "--", *rel_paths], cwd=workdir)
 
     commit_msg = f"chore(helm): update {package_name} to {version}"
+    # Identity via -c: per-invocation only, so the cached clone's .git/config
+    # is never mutated, and two `git config` process spawns are saved.
     commit_result = run_git(
-        ["commit", "-m", commit_msg],
+        [
+            "-c",
+            "user.name=github-actions[bot]",
+            "-c",
+            "user.email=github-actions[bot]@users.noreply.github.com",
+            "commit",
+            "-m",
+            commit_msg,
+        ],
         cwd=workdir,
         check=False,
     )
@@ -179,9 +562,7 @@ if __name__ == "__main__":
         sys.exit(1)
     except subprocess.CalledProcessError as e:
         if e.stderr:
-            print(e.stderr, file=sys.stderr)
-        if e.stdout:
-            print(e.stdout, file=sys.stdout)
+            print(e.stderr.decode("utf-8", "replace"), file=sys.stderr)
         sys.exit(e.returncode)
     except Exception as e:
         print(str(e), file=sys.stderr)
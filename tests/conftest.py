@@ -0,0 +1,6 @@
+"""Shared pytest setup: put the project root on sys.path so tests can import main."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -1,52 +1,66 @@
 """Tests for main module: build_auth_url, resolve_application_path, update_target_revision, main."""
 
 import os
-import subprocess
-import sys
-from pathlib import Path
+import re
 from unittest.mock import MagicMock, patch
 
 import pytest
+import yaml
 
-# Ensure project root is on path when running tests
-sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+_YAMLLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
-import main as main_module
-
-
-# --- build_auth_url ---
-
-
-def test_build_auth_url_https_without_dot_git():
-    out = main_module.build_auth_url("https://github.com/org/repo", "secret")
-    assert "x-access-token:secret@" in out
-    assert "github.com" in out
-    assert out.endswith(".git") or ".git" in out
-
-
-def test_build_auth_url_https_with_dot_git():
-    out = main_module.build_auth_url("https://github.com/org/repo.git", "tok")
-    assert "x-access-token:tok@" in out
-    assert "github.com" in out
+# Matches the updated scalar without paying for a full YAML parse.
+_TR_RE = re.compile(r"targetRevision:\s*[\"']?2\.0\.0[\"']?")
 
+# Fixture documents shared by the main() tests: written once here, formatted
+# per-test instead of re-typed inline.
+_PKG_YAML = """packages:
+  - name: mypkg
+    path: app.yaml
+"""
+_PKG_YAML_ENV = """packages:
+  - name: mypkg
+    path: apps/$/application.yaml
+"""
+_APP_YAML_TEMPLATE = "kind: Application\nspec:\n  source:\n    chart: {chart}\n    targetRevision: {rev}"
+_APP_YAML_FULL_TEMPLATE = """apiVersion: argoproj.io/v1alpha1
+kind: Application
+metadata:
+  name: test
+spec:
+  source:
+    chart: mychart
+    targetRevision: "{rev}"
+"""
 
-def test_build_auth_url_git_at_github():
-    out = main_module.build_auth_url("git@github.com:org/repo.git", "t")
-    assert "https://" in out
-    assert "x-access-token:t@" in out
-    assert "github.com" in out
+import main as main_module
 
 
-def test_build_auth_url_non_https_unchanged():
-    out = main_module.build_auth_url("http://example.com/repo.git", "x")
-    assert out == "http://example.com/repo.git"
-    out2 = main_module.build_auth_url("ssh://git@other.com/repo", "x")
-    assert out2 == "ssh://git@other.com/repo"
+# --- build_auth_url ---
 
 
-def test_build_auth_url_strips_whitespace():
-    out = main_module.build_auth_url("  https://github.com/a/b.git  ", "t")
-    assert "x-access-token:t@" in out
+@pytest.mark.parametrize(
+    ("url", "token", "contains", "equals"),
+    [
+        # https without .git
+        ("https://github.com/org/repo", "secret", ["x-access-token:secret@", "github.com", ".git"], None),
+        # https with .git
+        ("https://github.com/org/repo.git", "tok", ["x-access-token:tok@", "github.com"], None),
+        # SSH form rewritten to https
+        ("git@github.com:org/repo.git", "t", ["https://", "x-access-token:t@", "github.com"], None),
+        # non-https URLs pass through unchanged
+        ("http://example.com/repo.git", "x", [], "http://example.com/repo.git"),
+        ("ssh://git@other.com/repo", "x", [], "ssh://git@other.com/repo"),
+        # surrounding whitespace is stripped
+        ("  https://github.com/a/b.git  ", "t", ["x-access-token:t@"], None),
+    ],
+)
+def test_build_auth_url(url, token, contains, equals):
+    out = main_module.build_auth_url(url, token)
+    for fragment in contains:
+        assert fragment in out
+    if equals is not None:
+        assert out == equals
 
 
 # --- resolve_application_path ---
@@ -61,6 +75,13 @@ def test_resolve_application_path_file_valid(tmp_path):
     assert doc.get("kind") == "Application"
 
 
+def test_resolve_application_path_accepts_any_kind_spacing(tmp_path):
+    # Aligned or tab-separated values are valid YAML; only the parsed kind decides.
+    (tmp_path / "app.yaml").write_text("kind:   Application\nspec:\n  source:\n    chart: c\n    targetRevision: '1'")
+    _, doc = main_module.resolve_application_path(str(tmp_path), "app.yaml", None)
+    assert doc["kind"] == "Application"
+
+
 def test_resolve_application_path_file_not_application_exits(tmp_path):
     (tmp_path / "bad.yaml").write_text("kind: ConfigMap")
     with pytest.raises(SystemExit):
@@ -78,6 +99,185 @@ def test_resolve_application_path_nonexistent_exits(tmp_path):
         main_module.resolve_application_path(str(tmp_path), "nonexistent", None)
 
 
+# --- find_package_streaming ---
+
+
+def test_find_package_streaming_finds_entry_with_types():
+    content = """packages:
+  - name: first
+    path: a.yaml
+  - name: second
+    path: b.yaml
+    bootstrap: true
+"""
+    pkg = main_module.find_package_streaming(content, "second")
+    assert pkg == {"name": "second", "path": "b.yaml", "bootstrap": True}
+
+
+def test_find_package_streaming_missing_returns_none():
+    content = "packages:\n  - name: only\n    path: a.yaml\n"
+    assert main_module.find_package_streaming(content, "other") is None
+
+
+def test_find_package_streaming_no_packages_key_falls_back():
+    with pytest.raises(main_module._StreamFallback):
+        main_module.find_package_streaming("other: value\n", "x")
+
+
+def test_find_package_streaming_types_names_like_full_parse():
+    # name: 123 parses as an int, so only the quoted entry matches "123" —
+    # in the fast path and in _lookup_package alike.
+    content = "packages:\n  - name: 123\n    path: a.yaml\n  - name: '123'\n    path: b.yaml\n"
+    pkg = main_module.find_package_streaming(content, "123")
+    assert pkg == {"name": "123", "path": "b.yaml"}
+    assert pkg == main_module._lookup_package(yaml.load(content, Loader=_YAMLLoader), "123")
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "packages:\n  - name: x\n    path: a.yaml\n---\nother: doc\n",
+        "other: doc\n---\npackages:\n  - name: x\n    path: a.yaml\n",
+    ],
+    ids=["second-doc-after-packages", "packages-in-second-doc"],
+)
+def test_find_package_streaming_multi_document_falls_back(content):
+    # safe_load rejects multi-document streams; the full parse must get to do so.
+    with pytest.raises(main_module._StreamFallback):
+        main_module.find_package_streaming(content, "x")
+
+
+def test_find_package_streaming_nested_entry_falls_back():
+    content = "packages:\n  - name: x\n    meta:\n      a: 1\n"
+    with pytest.raises(main_module._StreamFallback):
+        main_module.find_package_streaming(content, "x")
+
+
+# --- write_revision ---
+
+
+def _write_app(tmp_path, text):
+    app = tmp_path / "app.yaml"
+    app.write_text(text, encoding="utf-8")
+    return app
+
+
+def test_write_revision_preserves_comments_and_quotes(tmp_path):
+    text = """# deployed by CI
+kind: Application
+spec:
+  source:
+    chart: mychart
+    targetRevision: "1.0.0"  # bumped automatically
+"""
+    app = _write_app(tmp_path, text)
+    main_module.write_revision(str(app), yaml.load(text, Loader=_YAMLLoader), "2.0.0", None)
+    out = app.read_text()
+    assert 'targetRevision: "2.0.0"  # bumped automatically' in out
+    assert out.startswith("# deployed by CI\n")
+
+
+def test_write_revision_selects_source_by_chart_name(tmp_path):
+    text = """spec:
+  sources:
+    - chart: c1
+      targetRevision: '1'
+    - chart: c2
+      targetRevision: '2'
+"""
+    app = _write_app(tmp_path, text)
+    main_module.write_revision(str(app), yaml.load(text, Loader=_YAMLLoader), "9", "c2")
+    out = app.read_text()
+    assert "targetRevision: '1'" in out
+    assert "targetRevision: '9'" in out
+
+
+def test_write_revision_splice_keeps_file_mode(tmp_path):
+    app = _write_app(tmp_path, "spec:\n  source:\n    chart: c\n    targetRevision: '1'\n")
+    os.chmod(app, 0o755)
+    main_module.write_revision(str(app), yaml.load(app.read_text(), Loader=_YAMLLoader), "2", None)
+    assert os.stat(app).st_mode & 0o777 == 0o755
+    assert "targetRevision: '2'" in app.read_text()
+
+
+def test_write_revision_chart_in_next_source_falls_back(tmp_path):
+    # The chart-first second source must not be attributed to the git source
+    # above it; with no line attributable to the chart, the dump path runs and
+    # the git source keeps its revision.
+    text = """spec:
+  sources:
+    - repoURL: https://git.example/repo.git
+      targetRevision: main
+    - chart: wanted
+      repoURL: https://charts.example
+"""
+    app = _write_app(tmp_path, text)
+    doc = yaml.load(text, Loader=_YAMLLoader)
+    doc["spec"]["sources"][1]["targetRevision"] = "9.9.9"
+    main_module.write_revision(str(app), doc, "9.9.9", "wanted")
+    out = yaml.load(app.read_text(), Loader=_YAMLLoader)
+    assert out["spec"]["sources"][0]["targetRevision"] == "main"
+    assert out["spec"]["sources"][1]["targetRevision"] == "9.9.9"
+
+
+def test_write_revision_ambiguous_falls_back_to_dump(tmp_path):
+    text = """spec:
+  sources:
+    - chart: c1
+      targetRevision: '1'
+    - chart: c2
+      targetRevision: '2'
+"""
+    app = _write_app(tmp_path, text)
+    doc = yaml.load(text, Loader=_YAMLLoader)
+    doc["spec"]["sources"][0]["targetRevision"] = "9"
+    main_module.write_revision(str(app), doc, "9", None)
+    assert yaml.load(app.read_text(), Loader=_YAMLLoader) == doc
+
+
+def test_write_revision_flow_style_falls_back_to_dump(tmp_path):
+    app = _write_app(tmp_path, "spec:\n  source: {chart: c, targetRevision: '1'}\n")
+    doc = {"spec": {"source": {"chart": "c", "targetRevision": "2"}}}
+    main_module.write_revision(str(app), doc, "2", None)
+    assert yaml.load(app.read_text(), Loader=_YAMLLoader) == doc
+
+
+# --- load_yaml_cached ---
+
+
+def test_load_yaml_cached_disabled_plain_parse(tmp_path, monkeypatch):
+    monkeypatch.delenv("ARGOHELM_YAML_CACHE", raising=False)
+    f = tmp_path / "pkg.yaml"
+    f.write_text("packages:\n  - name: a\n")
+    assert main_module.load_yaml_cached(f) == {"packages": [{"name": "a"}]}
+
+
+def test_load_yaml_cached_enabled_hits_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("ARGOHELM_YAML_CACHE", "1")
+    monkeypatch.setenv("RUNNER_TOOL_CACHE", str(tmp_path / "cache"))
+    f = tmp_path / "pkg.yaml"
+    f.write_text("packages:\n  - name: a\n")
+    first = main_module.load_yaml_cached(f)
+    cache_files = list((tmp_path / "cache" / "argohelm-pkg").glob("*.pkl"))
+    assert len(cache_files) == 1
+    # Second load must come from the pickle cache and be equal
+    second = main_module.load_yaml_cached(f)
+    assert second == first
+
+
+# --- parse_yaml ---
+
+
+def test_parse_yaml_cache_returns_independent_copies(monkeypatch):
+    monkeypatch.setenv("ARGOHELM_PARSE_CACHE", "1")
+    content = "spec:\n  source:\n    targetRevision: '1'\n"
+    first = main_module.parse_yaml(content)
+    second = main_module.parse_yaml(content)
+    assert first == second
+    first["spec"]["source"]["targetRevision"] = "mutated"
+    assert main_module.parse_yaml(content)["spec"]["source"]["targetRevision"] == "1"
+
+
 # --- update_target_revision ---
 
 
@@ -107,6 +307,14 @@ def test_update_target_revision_spec_sources_with_chart_name():
     assert doc["spec"]["sources"][1]["targetRevision"] == "9"
 
 
+def test_update_target_revision_returns_false_when_already_at_version():
+    doc = {"spec": {"source": {"chart": "mychart", "targetRevision": "2.0.0"}}}
+    assert main_module.update_target_revision(doc, "2.0.0", None) is False
+    doc_multi = {"spec": {"sources": [{"chart": "c1", "targetRevision": "3"}]}}
+    assert main_module.update_target_revision(doc_multi, "3", None) is False
+    assert main_module.update_target_revision(doc_multi, "4", None) is True
+
+
 def test_update_target_revision_chart_name_mismatch_exits():
     doc = {"spec": {"source": {"chart": "other", "targetRevision": "1"}}}
     with pytest.raises(SystemExit):
@@ -119,25 +327,93 @@ def test_update_target_revision_no_source_exits():
         main_module.update_target_revision(doc, "1", None)
 
 
+# --- prepare_workdir ---
+
+
+def test_prepare_workdir_fresh_cache_clones(tmp_path, monkeypatch):
+    monkeypatch.setenv("RUNNER_TOOL_CACHE", str(tmp_path))
+    with patch.object(main_module, "run_git") as m_run_git:
+        m_run_git.return_value = MagicMock(returncode=0)
+        workdir = main_module.prepare_workdir("https://github.com/org/repo.git", "https://x@github.com/org/repo.git", "main", ".")
+    assert workdir.startswith(str(tmp_path))
+    arg_lists = [c[0][0] for c in m_run_git.call_args_list]
+    assert arg_lists[0][0] == "clone"
+    assert "--filter=blob:none" in arg_lists[0]
+    assert any(args[0] == "sparse-checkout" for args in arg_lists)
+    assert arg_lists[-1] == ["checkout", "main"]
+
+
+def test_prepare_workdir_cached_clone_fetches(tmp_path, monkeypatch):
+    monkeypatch.setenv("RUNNER_TOOL_CACHE", str(tmp_path))
+    import hashlib
+    cache_dir = tmp_path / "argohelm" / hashlib.sha1(b"https://github.com/org/repo.git").hexdigest()
+    (cache_dir / ".git").mkdir(parents=True)
+    with patch.object(main_module, "run_git") as m_run_git:
+        m_run_git.return_value = MagicMock(returncode=0)
+        workdir = main_module.prepare_workdir("https://github.com/org/repo.git", "https://x@github.com/org/repo.git", "main", ".")
+    assert workdir == str(cache_dir)
+    arg_lists = [c[0][0] for c in m_run_git.call_args_list]
+    assert not any(args[0] == "clone" for args in arg_lists)
+    assert any(args[0] == "fetch" for args in arg_lists)
+    assert ["reset", "--hard", "FETCH_HEAD"] in arg_lists
+    assert ["clean", "-fdx"] in arg_lists
+
+
 # --- main() with mocks ---
 
 
-def test_main_happy_path_updates_application_file(tmp_path):
-    workdir = tmp_path / "workdir"
-    workdir.mkdir()
-    (workdir / "packages.yaml").write_text("""packages:
-  - name: mypkg
-    path: app.yaml
-""")
-    (workdir / "app.yaml").write_text("""apiVersion: argoproj.io/v1alpha1
-kind: Application
-metadata:
-  name: test
-spec:
-  source:
-    chart: mychart
-    targetRevision: "1.0.0"
-""")
+@pytest.fixture
+def main_harness(monkeypatch):
+    """Run main() with prepare_workdir/run_git stubbed and the env applied.
+
+    monkeypatch restores everything with a single teardown, replacing the
+    three nested patch contexts each test used to build. Returns the run_git
+    mock for call inspection.
+    """
+
+    def _run(env: dict, workdir) -> MagicMock:
+        monkeypatch.setattr(main_module, "prepare_workdir", lambda *a, **k: str(workdir))
+        m_run_git = MagicMock(return_value=MagicMock(returncode=0))
+        monkeypatch.setattr(main_module, "run_git", m_run_git)
+        for key, value in env.items():
+            monkeypatch.setenv(key, value)
+        main_module.main()
+        return m_run_git
+
+    return _run
+
+
+def _git_verbs(m_run_git) -> dict[str, list]:
+    """Classify the mocked git calls in a single pass: verb -> argv lists.
+
+    Commit invocations carry -c identity flags first, so they are keyed by the
+    presence of "commit" rather than argv[0].
+    """
+    by_verb: dict[str, list] = {}
+    for call in m_run_git.call_args_list:
+        args = call[0][0]
+        if not args:
+            continue
+        verb = "commit" if "commit" in args else args[0]
+        by_verb.setdefault(verb, []).append(args)
+    return by_verb
+
+
+@pytest.fixture(scope="module")
+def shared_tmp(tmp_path_factory):
+    """One numbered dir for the whole module; tests carve out per-node subdirs.
+
+    pytest's make_numbered_dir behind tmp_path is the dominant per-test setup
+    cost, so the main() tests share a single module-scoped directory.
+    """
+    return tmp_path_factory.mktemp("test_main")
+
+
+def test_main_happy_path_updates_application_file(shared_tmp, request, main_harness):
+    workdir = shared_tmp / request.node.name / "workdir"
+    workdir.mkdir(parents=True)
+    (workdir / "packages.yaml").write_text(_PKG_YAML)
+    (workdir / "app.yaml").write_text(_APP_YAML_FULL_TEMPLATE.format(rev="1.0.0"))
 
     env = {
         "INPUT_REPO_URL": "https://github.com/org/repo.git",
@@ -149,30 +425,19 @@ spec:
         "INPUT_BRANCH": "main",
     }
 
-    with patch.object(main_module, "tempfile") as m_tempfile:
-        m_tempfile.mkdtemp.return_value = str(workdir)
-        with patch.object(main_module, "run_git") as m_run_git:
-            m_run_git.return_value = MagicMock(returncode=0)
-            with patch.dict(os.environ, env, clear=False):
-                main_module.main()
+    m_run_git = main_harness(env, workdir)
 
     # Application file should have updated targetRevision
     content = (workdir / "app.yaml").read_text()
-    assert "2.0.0" in content
-    import yaml
-    doc = yaml.safe_load(content)
-    assert doc["spec"]["source"]["targetRevision"] == "2.0.0"
+    assert _TR_RE.search(content)
 
-    # Git should have been called: clone, config (x2), add, commit, push
-    assert m_run_git.call_count >= 5
-    arg_lists = [c[0][0] for c in m_run_git.call_args_list]
-    first_call = arg_lists[0]
-    assert first_call[:6] == ["clone", "--branch", "main", "--single-branch", "--depth", "1"]
-    assert any("config" in args for args in arg_lists)
-    add_calls = [args for args in arg_lists if args and args[0] == "add"]
-    assert len(add_calls) == 1
-    commit_calls = [args for args in arg_lists if args and args[0] == "commit"]
+    # Git should have been called: add, commit (with -c identity), push
+    assert m_run_git.call_count >= 3
+    by_verb = _git_verbs(m_run_git)
+    assert len(by_verb.get("add", [])) == 1
+    commit_calls = by_verb.get("commit", [])
     assert len(commit_calls) == 1
+    assert any(a.startswith("user.name=") for a in commit_calls[0])
 
 
 def test_main_missing_required_input_exits():
@@ -181,15 +446,15 @@ def test_main_missing_required_input_exits():
             main_module.main()
 
 
-def test_main_package_not_in_file_skips_without_error(tmp_path, capsys):
+def test_main_package_not_in_file_skips_without_error(shared_tmp, request, main_harness, capsys):
     """When the requested package is not in packages file, main() returns without error and prints skip message."""
-    workdir = tmp_path / "workdir"
-    workdir.mkdir()
+    workdir = shared_tmp / request.node.name / "workdir"
+    workdir.mkdir(parents=True)
     (workdir / "packages.yaml").write_text("""packages:
   - name: otherpkg
     path: app.yaml
 """)
-    (workdir / "app.yaml").write_text("kind: Application\nspec:\n  source:\n    chart: x\n    targetRevision: '1'")
+    (workdir / "app.yaml").write_text(_APP_YAML_TEMPLATE.format(chart="x", rev="'1'"))
 
     env = {
         "INPUT_REPO_URL": "https://github.com/org/repo.git",
@@ -201,32 +466,28 @@ def test_main_package_not_in_file_skips_without_error(tmp_path, capsys):
         "INPUT_BRANCH": "main",
     }
 
-    with patch.object(main_module, "tempfile") as m_tempfile:
-        m_tempfile.mkdtemp.return_value = str(workdir)
-        with patch.object(main_module, "run_git") as m_run_git:
-            m_run_git.return_value = MagicMock(returncode=0)
-            with patch.dict(os.environ, env, clear=False):
-                main_module.main()
+    m_run_git = main_harness(env, workdir)
 
     out, err = capsys.readouterr()
     assert "missingpkg" in out
     assert "not found" in out
     assert "skipping" in out
     # Application file unchanged
-    assert "1" in (workdir / "app.yaml").read_text()
-    assert "2.0.0" not in (workdir / "app.yaml").read_text()
+    content = (workdir / "app.yaml").read_text()
+    assert "1" in content
+    assert "2.0.0" not in content
 
 
-def test_main_bootstrap_true_skips_without_updating(tmp_path, capsys):
+def test_main_bootstrap_true_skips_without_updating(shared_tmp, request, main_harness, capsys):
     """When the matched package has bootstrap: true, main() exits without changing the Application or git add/commit."""
-    workdir = tmp_path / "workdir"
-    workdir.mkdir()
+    workdir = shared_tmp / request.node.name / "workdir"
+    workdir.mkdir(parents=True)
     (workdir / "packages.yaml").write_text("""packages:
   - name: mypkg
     bootstrap: true
     path: app.yaml
 """)
-    (workdir / "app.yaml").write_text("kind: Application\nspec:\n  source:\n    chart: x\n    targetRevision: '1.0.0'")
+    (workdir / "app.yaml").write_text(_APP_YAML_TEMPLATE.format(chart="x", rev="'1.0.0'"))
 
     env = {
         "INPUT_REPO_URL": "https://github.com/org/repo.git",
@@ -238,34 +499,27 @@ def test_main_bootstrap_true_skips_without_updating(tmp_path, capsys):
         "INPUT_BRANCH": "main",
     }
 
-    with patch.object(main_module, "tempfile") as m_tempfile:
-        m_tempfile.mkdtemp.return_value = str(workdir)
-        with patch.object(main_module, "run_git") as m_run_git:
-            m_run_git.return_value = MagicMock(returncode=0)
-            with patch.dict(os.environ, env, clear=False):
-                main_module.main()
+    m_run_git = main_harness(env, workdir)
 
     out, _ = capsys.readouterr()
     assert "Bootstrap" in out
     assert "skipping" in out
-    assert "2.0.0" not in (workdir / "app.yaml").read_text()
-    assert "1.0.0" in (workdir / "app.yaml").read_text()
+    content = (workdir / "app.yaml").read_text()
+    assert "2.0.0" not in content
+    assert "1.0.0" in content
 
     arg_lists = [c[0][0] for c in m_run_git.call_args_list]
     assert not any(args and args[0] == "add" for args in arg_lists)
-    assert not any(args and args[0] == "commit" for args in arg_lists)
+    assert not any("commit" in args for args in arg_lists)
 
 
-def test_main_path_with_dollar_environment_provided_updates_one_file(tmp_path):
+def test_main_path_with_dollar_environment_provided_updates_one_file(shared_tmp, request, main_harness):
     """Path with $ and environment set: single file (e.g. apps/dev/application.yaml) updated."""
-    workdir = tmp_path / "workdir"
-    workdir.mkdir()
-    (workdir / "packages.yaml").write_text("""packages:
-  - name: mypkg
-    path: apps/$/application.yaml
-""")
+    workdir = shared_tmp / request.node.name / "workdir"
+    workdir.mkdir(parents=True)
+    (workdir / "packages.yaml").write_text(_PKG_YAML_ENV)
     (workdir / "apps" / "dev").mkdir(parents=True)
-    app_content = "kind: Application\nspec:\n  source:\n    chart: c\n    targetRevision: '1.0.0'"
+    app_content = _APP_YAML_TEMPLATE.format(chart="c", rev="'1.0.0'")
     (workdir / "apps" / "dev" / "application.yaml").write_text(app_content)
 
     env = {
@@ -279,32 +533,164 @@ def test_main_path_with_dollar_environment_provided_updates_one_file(tmp_path):
         "INPUT_ENVIRONMENT": "dev",
     }
 
-    with patch.object(main_module, "tempfile") as m_tempfile:
-        m_tempfile.mkdtemp.return_value = str(workdir)
-        with patch.object(main_module, "run_git") as m_run_git:
-            m_run_git.return_value = MagicMock(returncode=0)
-            with patch.dict(os.environ, env, clear=False):
-                main_module.main()
+    m_run_git = main_harness(env, workdir)
 
     assert (workdir / "apps" / "dev" / "application.yaml").read_text().count("2.0.0") >= 1
     add_calls = [c[0][0] for c in m_run_git.call_args_list if c[0][0] and c[0][0][0] == "add"]
     assert len(add_calls) == 1
-    commit_calls = [c for c in m_run_git.call_args_list if c[0][0] and c[0][0][0] == "commit"]
+    commit_calls = [c for c in m_run_git.call_args_list if "commit" in c[0][0]]
     assert len(commit_calls) == 1
 
 
-def test_main_path_with_dollar_without_environment_fails(tmp_path):
+def test_main_already_at_version_skips_write_and_commit(shared_tmp, request, main_harness, capsys):
+    """When targetRevision already equals version, main() neither rewrites the file nor runs add/commit/push."""
+    workdir = shared_tmp / request.node.name / "workdir"
+    workdir.mkdir(parents=True)
+    (workdir / "packages.yaml").write_text(_PKG_YAML)
+    app_content = _APP_YAML_TEMPLATE.format(chart="c", rev="2.0.0") + "\n"
+    (workdir / "app.yaml").write_text(app_content)
+
+    env = {
+        "INPUT_REPO_URL": "https://github.com/org/repo.git",
+        "INPUT_TOKEN": "secret",
+        "INPUT_PACKAGE_FILE_PATH": "packages.yaml",
+        "INPUT_PACKAGE_NAME": "mypkg",
+        "INPUT_VERSION": "2.0.0",
+        "INPUT_CHART_NAME": "",
+        "INPUT_BRANCH": "main",
+    }
+
+    m_run_git = main_harness(env, workdir)
+
+    out, _ = capsys.readouterr()
+    assert "No changes to commit" in out
+    assert (workdir / "app.yaml").read_text() == app_content
+    arg_lists = [c[0][0] for c in m_run_git.call_args_list]
+    assert not any(args and (args[0] in ("add", "push") or "commit" in args) for args in arg_lists)
+
+
+def test_main_multi_updates_multiple_env_files(shared_tmp, request, main_harness):
+    """Comma-separated environment: one run updates the Application file of every listed environment."""
+    workdir = shared_tmp / request.node.name / "workdir"
+    workdir.mkdir(parents=True)
+    (workdir / "packages.yaml").write_text(_PKG_YAML_ENV)
+    app_content = _APP_YAML_TEMPLATE.format(chart="c", rev="'1.0.0'")
+    for env_name in ("dev", "staging"):
+        (workdir / "apps" / env_name).mkdir(parents=True)
+        (workdir / "apps" / env_name / "application.yaml").write_text(app_content)
+
+    env = {
+        "INPUT_REPO_URL": "https://github.com/org/repo.git",
+        "INPUT_TOKEN": "secret",
+        "INPUT_PACKAGE_FILE_PATH": "packages.yaml",
+        "INPUT_PACKAGE_NAME": "mypkg",
+        "INPUT_VERSION": "2.0.0",
+        "INPUT_CHART_NAME": "",
+        "INPUT_BRANCH": "main",
+        "INPUT_ENVIRONMENT": "dev,staging",
+    }
+
+    m_run_git = main_harness(env, workdir)
+
+    dev_text = (workdir / "apps" / "dev" / "application.yaml").read_text()
+    staging_text = (workdir / "apps" / "staging" / "application.yaml").read_text()
+    assert dev_text.count("2.0.0") >= 1
+    assert staging_text.count("2.0.0") >= 1
+    by_verb = _git_verbs(m_run_git)
+    add_calls = by_verb.get("add", [])
+    assert len(add_calls) == 1
+    assert "apps/dev/application.yaml" in add_calls[0]
+    assert "apps/staging/application.yaml" in add_calls[0]
+    assert len(by_verb.get("commit", [])) == 1
+
+
+def test_main_non_ascii_manifest_patched_in_place(shared_tmp, request, main_harness):
+    """Manifests with non-ASCII comments take the text patch path and keep their formatting."""
+    workdir = shared_tmp / request.node.name / "workdir"
+    workdir.mkdir(parents=True)
+    (workdir / "packages.yaml").write_text(_PKG_YAML)
+    app_content = "# déploiement\nkind: Application\nspec:\n  source:\n    chart: c\n    targetRevision: '1.0.0'\n"
+    (workdir / "app.yaml").write_text(app_content, encoding="utf-8")
+
+    env = {
+        "INPUT_REPO_URL": "https://github.com/org/repo.git",
+        "INPUT_TOKEN": "secret",
+        "INPUT_PACKAGE_FILE_PATH": "packages.yaml",
+        "INPUT_PACKAGE_NAME": "mypkg",
+        "INPUT_VERSION": "2.0.0",
+        "INPUT_CHART_NAME": "",
+        "INPUT_BRANCH": "main",
+    }
+
+    m_run_git = main_harness(env, workdir)
+
+    content = (workdir / "app.yaml").read_text(encoding="utf-8")
+    assert content == app_content.replace("'1.0.0'", "'2.0.0'")
+
+
+def test_main_multi_invalid_target_writes_nothing(shared_tmp, request, main_harness):
+    """If any environment's manifest fails validation, no file is written at all."""
+    workdir = shared_tmp / request.node.name / "workdir"
+    workdir.mkdir(parents=True)
+    (workdir / "packages.yaml").write_text(_PKG_YAML_ENV)
+    good = _APP_YAML_TEMPLATE.format(chart="wanted", rev="'1.0.0'")
+    bad = _APP_YAML_TEMPLATE.format(chart="other", rev="'1.0.0'")
+    (workdir / "apps" / "dev").mkdir(parents=True)
+    (workdir / "apps" / "dev" / "application.yaml").write_text(good)
+    (workdir / "apps" / "staging").mkdir(parents=True)
+    (workdir / "apps" / "staging" / "application.yaml").write_text(bad)
+
+    env = {
+        "INPUT_REPO_URL": "https://github.com/org/repo.git",
+        "INPUT_TOKEN": "secret",
+        "INPUT_PACKAGE_FILE_PATH": "packages.yaml",
+        "INPUT_PACKAGE_NAME": "mypkg",
+        "INPUT_VERSION": "2.0.0",
+        "INPUT_CHART_NAME": "wanted",
+        "INPUT_BRANCH": "main",
+        "INPUT_ENVIRONMENT": "dev,staging",
+    }
+
+    with pytest.raises(SystemExit):
+        main_harness(env, workdir)
+
+    assert "2.0.0" not in (workdir / "apps" / "dev" / "application.yaml").read_text()
+    assert "2.0.0" not in (workdir / "apps" / "staging" / "application.yaml").read_text()
+
+
+def test_main_multi_duplicate_environments_resolve_once(shared_tmp, request, main_harness):
+    """Environments mapping to the same file (duplicates) are parsed and staged only once."""
+    workdir = shared_tmp / request.node.name / "workdir"
+    workdir.mkdir(parents=True)
+    (workdir / "packages.yaml").write_text(_PKG_YAML_ENV)
+    (workdir / "apps" / "dev").mkdir(parents=True)
+    (workdir / "apps" / "dev" / "application.yaml").write_text(_APP_YAML_TEMPLATE.format(chart="c", rev="'1.0.0'"))
+
+    env = {
+        "INPUT_REPO_URL": "https://github.com/org/repo.git",
+        "INPUT_TOKEN": "secret",
+        "INPUT_PACKAGE_FILE_PATH": "packages.yaml",
+        "INPUT_PACKAGE_NAME": "mypkg",
+        "INPUT_VERSION": "2.0.0",
+        "INPUT_CHART_NAME": "",
+        "INPUT_BRANCH": "main",
+        "INPUT_ENVIRONMENT": "dev,dev",
+    }
+
+    m_run_git = main_harness(env, workdir)
+
+    assert "2.0.0" in (workdir / "apps" / "dev" / "application.yaml").read_text()
+    add_calls = [c[0][0] for c in m_run_git.call_args_list if c[0][0] and c[0][0][0] == "add"]
+    assert add_calls == [["add", "--", "apps/dev/application.yaml"]]
+
+
+def test_main_path_with_dollar_without_environment_fails(shared_tmp, request, main_harness):
     """Path contains $ but environment empty: action fails."""
-    workdir = tmp_path / "workdir"
-    workdir.mkdir()
-    (workdir / "packages.yaml").write_text("""packages:
-  - name: mypkg
-    path: apps/$/application.yaml
-""")
+    workdir = shared_tmp / request.node.name / "workdir"
+    workdir.mkdir(parents=True)
+    (workdir / "packages.yaml").write_text(_PKG_YAML_ENV)
     (workdir / "apps" / "dev").mkdir(parents=True)
-    (workdir / "apps" / "dev" / "application.yaml").write_text(
-        "kind: Application\nspec:\n  source:\n    chart: c\n    targetRevision: '1'"
-    )
+    (workdir / "apps" / "dev" / "application.yaml").write_text(_APP_YAML_TEMPLATE.format(chart="c", rev="'1'"))
 
     env = {
         "INPUT_REPO_URL": "https://github.com/org/repo.git",
@@ -316,23 +702,38 @@ def test_main_path_with_dollar_without_environment_fails(tmp_path):
         "INPUT_ENVIRONMENT": "",
     }
 
-    with patch.object(main_module, "tempfile") as m_tempfile:
-        m_tempfile.mkdtemp.return_value = str(workdir)
-        with patch.object(main_module, "run_git") as m_run_git:
-            m_run_git.return_value = MagicMock(returncode=0)
-            with patch.dict(os.environ, env, clear=False):
-                with pytest.raises(SystemExit):
-                    main_module.main()
+    with pytest.raises(SystemExit):
+        main_harness(env, workdir)
 
 
 # --- integration test (real clone, mock push) ---
 
 
+_INTEGRATION = os.environ.get("RUN_INTEGRATION") == "1"
+
+
+@pytest.fixture(scope="session")
+def github_reachable():
+    """Skip (once per session) instead of hanging when github.com is unreachable."""
+    import socket
+
+    try:
+        socket.create_connection(("github.com", 443), timeout=0.5).close()
+    except OSError:
+        pytest.skip("github.com not reachable")
+
+
 @pytest.mark.integration
-@pytest.mark.skip(reason="Mock repo uses directory path; action now requires path to be a file (see plan). Update ArgoHelmDeploy-Mock packages.yaml to use file path to run this test.")
-def test_integration_real_mock_repo(tmp_path):
+@pytest.mark.skipif(
+    not _INTEGRATION,
+    reason="set RUN_INTEGRATION=1 to run the live clone (ArgoHelmDeploy-Mock packages.yaml must use a file path)",
+)
+def test_integration_real_mock_repo(tmp_path, github_reachable):
     """Clone real ArgoHelmDeploy-Mock repo, run main(), assert application.yaml updated; push is mocked."""
-    workdir = tmp_path / "workdir"
+    import hashlib
+
+    repo_url = "https://github.com/ValoriaTechnologia/ArgoHelmDeploy-Mock.git"
+    workdir = tmp_path / "argohelm" / hashlib.sha1(repo_url.encode()).hexdigest()
 
     run_git_orig = main_module.run_git
 
@@ -342,24 +743,22 @@ def test_integration_real_mock_repo(tmp_path):
         return run_git_orig(args, cwd=cwd, check=check)
 
     env = {
-        "INPUT_REPO_URL": "https://github.com/ValoriaTechnologia/ArgoHelmDeploy-Mock.git",
+        "INPUT_REPO_URL": repo_url,
         "INPUT_TOKEN": "dummy",
         "INPUT_PACKAGE_FILE_PATH": "packages.yaml",
         "INPUT_PACKAGE_NAME": "argo-app",
         "INPUT_VERSION": "2.0.0",
         "INPUT_CHART_NAME": "my-chart",
         "INPUT_BRANCH": "main",
+        "RUNNER_TOOL_CACHE": str(tmp_path),
     }
 
-    with patch.object(main_module, "tempfile") as m_tempfile:
-        m_tempfile.mkdtemp.return_value = str(workdir)
-        with patch.object(main_module, "run_git", run_git_wrapper):
-            with patch.dict(os.environ, env, clear=False):
-                main_module.main()
+    with patch.object(main_module, "run_git", run_git_wrapper):
+        with patch.dict(os.environ, env, clear=False):
+            main_module.main()
 
     app_file = workdir / "application.yaml"
     assert app_file.exists(), "application.yaml should exist after main()"
-    import yaml
-    doc = yaml.safe_load(app_file.read_text(encoding="utf-8"))
+    doc = yaml.load(app_file.read_text(encoding="utf-8"), Loader=_YAMLLoader)
     assert doc.get("spec", {}).get("source", {}).get("targetRevision") == "2.0.0"
     assert doc.get("spec", {}).get("source", {}).get("chart") == "my-chart"